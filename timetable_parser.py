@@ -1,12 +1,20 @@
 #!/bin/env python3
 
+import re
+import csv
 import sys
 import difflib
+import functools
+import xml.etree.ElementTree as ET
+import numpy as np
 import pandas as pd
-import pandas.core.series
 import openpyxl as xl
-from openpyxl.utils import get_column_letter
+from openpyxl.cell.cell import MergedCell
+from openpyxl.cell.read_only import ReadOnlyCell
+from openpyxl.utils import range_boundaries
+from openpyxl.utils.cell import coordinate_to_tuple
 from openpyxl.worksheet.worksheet import Worksheet as xl_Worksheet
+from rapidfuzz import process, fuzz
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.pagesizes import letter, landscape
@@ -21,50 +29,235 @@ from reportlab.platypus import (
 from reportlab.platypus.flowables import KeepTogether
 
 
-def _get_day(curr_day: str, cache: dict = None) -> str:
-    """Return the first chronological day present in the given
-      string as a lowercase string. Return '' if none is found"""
+# Matches the name of any day of the week
+_DAY_RE = re.compile(r'(mon|tues|wednes|thurs|fri|satur|sun)day', re.IGNORECASE)
+_DAY_TABLE = {
+    'mon': 'Monday',
+    'tues': 'Tuesday',
+    'wednes': 'Wednesday',
+    'thurs': 'Thursday',
+    'fri': 'Friday',
+    'satur': 'Saturday',
+    'sun': 'Sunday',
+}
+# Chronological number of each day in a week
+_DAY_NUMBERS = {day: day_no for day_no, day in enumerate(_DAY_TABLE.values(), 1)}
+
+
+@functools.lru_cache(maxsize=None)
+def _get_day(curr_day: str) -> str:
+    """Return the first chronological day present in the given string as
+      a capitalized string. Return '' if none is found"""
     if curr_day is None:
         return ''
 
-    if cache is None:
-        cache = {}
-
-    if curr_day in cache:
-        return cache[curr_day]
-
-    days = ['monday', 'tuesday', 'wednesday', 'thursday',
-            'friday', 'saturday', 'sunday']
-
-    curr_day = curr_day.lower()
-
-    for day in days:
-        if day in curr_day:
-            cache[curr_day] = day.capitalize()
-            return cache[curr_day]
+    days = [_DAY_TABLE[match.group(1).lower()]
+            for match in _DAY_RE.finditer(curr_day)]
+
+    return min(days, key=_DAY_NUMBERS.get, default='')
+
+
+def _can_stream(sheet: xl_Worksheet) -> bool:
+    """Return whether _read_sheet can stream the sheet's xml itself. It
+      goes through some of openpyxl's internals to do so, which only its
+      read-only sheets have and newer versions may well drop."""
+    return (sheet.parent.read_only and
+            hasattr(sheet, '_shared_strings') and
+            hasattr(sheet, '_get_source'))
+
+
+def _read_sheet(sheet: xl_Worksheet) -> tuple[dict, dict, set, int]:
+    """Return the values, fill colors and right border styles of every row
+      in the sheet, keyed by row number and padded to the width of its
+      widest row. Alongside, return the column span of every merged range,
+      keyed by the row and then the column of its top left cell, the set
+      of hidden column numbers in the sheet and the width of its rows."""
+    rows = {}
+    merged_spans = {}
+    hidden_columns = set()
+
+    # Only a handful of distinct styles exist, resolve each one just once
+    # rather than going through openpyxl's style proxies for every cell
+    styles = {}
+
+    if not _can_stream(sheet):
+        for row in sheet.iter_rows():
+            style_ids = [cell.style_id for cell in row]
+            for cell, style_id in zip(row, style_ids):
+                if style_id not in styles:
+                    styles[style_id] = (cell.fill.start_color.index,
+                                        cell.border.right.style)
+
+            rows[row[0].row] = (
+                [cell.value for cell in row],
+                [styles[style_id][0] for style_id in style_ids],
+                [styles[style_id][1] for style_id in style_ids],
+            )
+        for cell in sheet.merged_cells.ranges:
+            merged_spans.setdefault(cell.min_row, {})[cell.min_col] = \
+                cell.size['columns']
+        # A hidden group of columns is one <col> with a min and a max,
+        # every column in between is hidden, not just the first one
+        for dim in sheet.column_dimensions.values():
+            if dim.hidden:
+                hidden_columns.update(range(dim.min, dim.max + 1))
+        return rows, merged_spans, hidden_columns, sheet.max_column
+
+    # Stream the worksheet's xml ourselves rather than having openpyxl
+    # build a cell object for each of its cells. Read-only sheets also
+    # expose neither merged cells nor column dimensions.
+    shared_strings = sheet._shared_strings
+    merged_ranges = []
+
+    row_no = 0
+    source = sheet._get_source()
+    try:
+        for _, elem in ET.iterparse(source):
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag == 'row':
+                row_no = int(elem.get('r', row_no + 1))
+                values = []
+                style_ids = []
+
+                col_no = 0
+                for cell in elem:
+                    ref = cell.get('r')
+                    col_no = (coordinate_to_tuple(ref)[1] if ref is not None
+                              else col_no + 1)
+                    # Cells left out of the xml are empty
+                    missing = col_no - len(values)
+                    if missing > 0:
+                        values.extend([None] * missing)
+                        style_ids.extend([0] * missing)
+                    style_ids[col_no - 1] = int(cell.get('s', 0))
+                    values[col_no - 1] = _get_xml_cell_value(cell,
+                                                             shared_strings)
+
+                rows[row_no] = (values, style_ids)
+                # No need to keep the parsed row around
+                elem.clear()
+            elif tag == 'col' and elem.get('hidden') in ('1', 'true'):
+                hidden_columns.update(
+                    range(int(elem.get('min')), int(elem.get('max')) + 1)
+                )
+            elif tag == 'mergeCell':
+                bounds = range_boundaries(elem.get('ref'))
+                min_col, min_row, max_col, _ = bounds
+                merged_spans.setdefault(min_row, {})[min_col] = \
+                    max_col - min_col + 1
+                merged_ranges.append(bounds)
+    finally:
+        source.close()
+
+    # The width declared by the sheet can't be trusted, go by its cells
+    total_columns = max(
+        max((len(values) for values, _ in rows.values()), default=0),
+        max((max_col for _, _, max_col, _ in merged_ranges), default=0),
+    )
+    for row_no, (values, style_ids) in rows.items():
+        missing = total_columns - len(values)
+        values.extend([None] * missing)
+        style_ids.extend([0] * missing)
+
+        for style_id in style_ids:
+            if style_id not in styles:
+                style = ReadOnlyCell(sheet, row_no, 1, None,
+                                     style_id=style_id)
+                styles[style_id] = (style.fill.start_color.index,
+                                    style.border.right.style)
+
+        rows[row_no] = (
+            values,
+            [styles[style_id][0] for style_id in style_ids],
+            [styles[style_id][1] for style_id in style_ids],
+        )
 
-    return ''
+    # A regular sheet replaces every cell of a merged range but the top
+    # left one with an empty MergedCell of the default style. The top left
+    # cell falls back on the bottom right cell's right border, which then
+    # goes to every cell along the right edge. Do the same here, whatever
+    # styles the file itself gives these cells.
+    merged_cell = MergedCell(sheet)
+    merged_fill = merged_cell.fill.start_color.index
+    merged_border = merged_cell.border.right.style
+    for min_col, min_row, max_col, max_row in merged_ranges:
+        edge_border = None
+        if min_row in rows:
+            edge_border = rows[min_row][2][min_col - 1]
+        if edge_border is None and max_row in rows:
+            edge_border = rows[max_row][2][max_col - 1]
+            if min_row in rows:
+                rows[min_row][2][min_col - 1] = edge_border
+        if edge_border is None:
+            edge_border = merged_border
+
+        for row_no in range(min_row, max_row + 1):
+            if row_no not in rows:
+                continue
+            values, fill_colors, right_borders = rows[row_no]
+            for col_no in range(min_col - 1, max_col):
+                if row_no == min_row and col_no == min_col - 1:
+                    continue
+                values[col_no] = None
+                fill_colors[col_no] = merged_fill
+                right_borders[col_no] = (edge_border if col_no == max_col - 1
+                                         else merged_border)
+
+    return rows, merged_spans, hidden_columns, total_columns
+
+
+def _get_xml_cell_value(cell: ET.Element, shared_strings: list):
+    """Return the value held by a <c> element of a worksheet's xml"""
+    data_type = cell.get('t', 'n')
+    value = None
+
+    for child in cell:
+        tag = child.tag.rsplit('}', 1)[-1]
+        if tag == 'v':
+            value = child.text
+        elif tag == 'is':
+            # Inline strings may be split into several runs of text
+            return ''.join(
+                text.text or '' for text in child.iter()
+                if text.tag.rsplit('}', 1)[-1] == 't'
+            )
+
+    if value is None:
+        return None
+    if data_type == 's':
+        return shared_strings[int(value)]
+    if data_type == 'b':
+        return value == '1'
+    if data_type == 'n':
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    return value
 
 
-def parse_timetable(sheet: xl_Worksheet) -> pd.DataFrame:
+def parse_timetable(sheet: xl_Worksheet) -> list[dict]:
     """Extract course titles, sections, and lecture details from the main
-      timetable sheet. Return the extracted data as a pandas dataframe."""
-    total_columns = sheet.max_column
-
+      timetable sheet. Return the extracted data as a list of dicts, one
+      per course."""
     # Starting coordinates of the actual subjects' schedule
     STARTING_ROW, STARTING_COL = 5, 2
 
-    cell_coordinates = {}
-    for cell in sheet.merged_cells.ranges:
-        cell_coordinates[(cell.min_row, cell.min_col)] = cell.size['columns']
+    sheet_rows, merged_spans, hidden_columns, total_columns = \
+        _read_sheet(sheet)
+    # Indexed by the same 0-based column number as each row's values
+    is_hidden = [col_no + 1 in hidden_columns
+                 for col_no in range(total_columns)]
 
-    courses = []
-    total_courses = 0
-    course_cache = {}
+    # Lectures of every course, keyed by its (title, section)
+    course_lectures = {}
+    get_lectures = course_lectures.get
 
     day = ''
 
-    starting_time = sheet[STARTING_ROW - 1][2].value
+    starting_time = None
+    if STARTING_ROW - 1 in sheet_rows:
+        starting_time = sheet_rows[STARTING_ROW - 1][0][2]
     if starting_time is None or ':' not in starting_time:
         hours_offset = 8
         minutes_offset = 30
@@ -76,145 +269,175 @@ def parse_timetable(sheet: xl_Worksheet) -> pd.DataFrame:
         if is_pm:
             hours_offset += 12
 
-    for row in sheet.iter_rows(min_row=STARTING_ROW):
-        if row[0].value is not None:
-            day = _get_day(row[0].value)
+    # Every column is a 10 minute slot, so the time at each slot never
+    # changes within a sheet. Work all of them out, formatted, once.
+    longest_span = max(
+        (span for row_spans in merged_spans.values()
+         for span in row_spans.values()),
+        default=1
+    )
+    starting_minutes = hours_offset * 60 + minutes_offset
+    slot_times = [
+        '{:02}:{:02}'.format(*divmod(starting_minutes + slot * 10, 60))
+        for slot in range(total_columns + longest_span + 1)
+    ]
+
+    for row_no in sorted(sheet_rows):
+        if row_no < STARTING_ROW:
+            continue
+        values, fill_colors, right_borders = sheet_rows[row_no]
+        # Column span of every cell in the row, indexed like its values
+        spans = [1] * total_columns
+        for col, span in merged_spans.get(row_no, {}).items():
+            if col <= total_columns:
+                spans[col - 1] = span
+
+        if values[0] is not None:
+            day = _get_day(values[0])
 
-        room = row[1].value
+        room = values[1]
         if room is None:
             continue
-        room = room.strip()
+        # Rooms and sections repeat across many lectures, share one copy
+        room = sys.intern(room.strip())
 
         col_no = STARTING_COL
         col_no_offset = 0
         while col_no < total_columns:
-            col_letter = get_column_letter(col_no + 1)
-            if sheet.column_dimensions[col_letter].hidden:
+            if is_hidden[col_no]:
                 col_no += 1
                 col_no_offset += 1
                 continue
 
-            cell = row[col_no]
-            if cell.value is None:
-                col_no += cell_coordinates.get((cell.row, cell.column), 1)
+            value = values[col_no]
+            cell_length = spans[col_no]
+            if value is None:
+                col_no += cell_length
                 continue
 
-            if '(' not in cell.value:
-                col_no += cell_coordinates.get((cell.row, cell.column), 1)
+            title, bracket, sections = value.partition('(')
+            if not bracket:
+                col_no += cell_length
                 continue
 
-            course_details = cell.value.split('(')
-
-            # Ignore anything in brackets within the course name
-            # Such things like are of no use to us
-            title = course_details[0].split('(')[0].strip()
             # Replace '&' with 'and' for easier matching later on
-            title = title.replace('&', 'and', 1)
-
-            section_list = course_details[1].strip().rstrip(')').split(',')
+            title = title.strip().replace('&', 'and', 1)
 
-            start_time = [(hours_offset + (col_no - col_no_offset - STARTING_COL) // 6),
-                          minutes_offset + ((col_no - col_no_offset - STARTING_COL) % 6) * 10]
-            if start_time[1] >= 60:
-                start_time[0] += 1
-                start_time[1] -= 60
+            # Ignore anything in any further brackets
+            # Such things like are of no use to us
+            sections = sections.partition('(')[0]
+            section_list = sections.strip().rstrip(')').split(',')
 
-            cell_length = cell_coordinates.get((cell.row, cell.column), 1)
+            starting_slot = col_no - col_no_offset - STARTING_COL
 
             if cell_length == 1:
                 cells_remaining = total_columns - col_no
-                starting_color = cell.fill.start_color.index
+                starting_color = fill_colors[col_no]
                 while cell_length < cells_remaining:
-                    end_cell = row[col_no + cell_length]
-                    if (end_cell.value is not None or
-                            end_cell.fill.start_color.index != starting_color):
+                    end_col = col_no + cell_length
+                    if (values[end_col] is not None or
+                            fill_colors[end_col] != starting_color):
                         break
                     cell_length += 1
-                    if cell.border.right.style is not None:
+                    if right_borders[col_no] is not None:
                         break
 
             col_no += cell_length
 
-            length_of_class = [(cell_length // 6),
-                               (cell_length % 6) * 10]
-            end_time = [start_time[i] + length_of_class[i] for i in range(2)]
-            if end_time[1] >= 60:
-                end_time[0] += 1
-                end_time[1] -= 60
-
             current_lecture = {
                 'room': room,
                 'day': day,
-                'start_time': f'{start_time[0]:02}:{start_time[1]:02}',
-                'end_time': f'{end_time[0]:02}:{end_time[1]:02}',
+                'start_time': slot_times[starting_slot],
+                'end_time': slot_times[starting_slot + cell_length],
             }
 
             for section in section_list:
-                section = section.strip()
-                if (title, section) in course_cache:
-                    courses[course_cache[(title, section)]]['lectures'] \
-                        .append(current_lecture)
+                section = sys.intern(section.strip())
+                lectures = get_lectures((title, section))
+                if lectures is not None:
+                    lectures.append(current_lecture)
                 else:
-                    course_cache[(title, section)] = total_courses
-                    total_courses += 1
+                    course_lectures[(title, section)] = [current_lecture]
 
-                    courses.append({
-                        'title': title,
-                        'section': section,
-                        'lectures': [current_lecture],
-                    })
+    return [
+        {'title': title, 'section': section, 'lectures': lectures}
+        for (title, section), lectures in course_lectures.items()
+    ]
+
+
+# Substrings identifying a column header, along with the column they
+# identify. Checked in order, the first one still unassigned wins.
+_HEADER_MAP = (
+    ('code', 'code'),
+    ('title', 'title'),
+    ('course', 'title'),
+    ('section', 'section'),
+    ('teacher', 'instructor'),
+    ('instructor', 'instructor'),
+    ('credit', 'credit_hours'),
+    ('offered', 'offered_for'),
+    ('category', 'category'),
+)
+
+# Fields of every course returned by get_course_details, in order
+_COURSE_COLUMNS = (
+    'title', 'code', 'section', 'instructor', 'credit_hours', 'program',
+    'target_department', 'parent_department', 'type', 'repeat',
+)
+
+
+def _get_sheet_bounds(sheet: xl_Worksheet) -> tuple[int, int]:
+    """Return the number of rows and columns in the sheet. Read-only sheets
+      take these from the <dimension> declared in their xml, which may be
+      missing or wrong, so work them out from their cells instead."""
+    if sheet.parent.read_only:
+        sheet.reset_dimensions()
+        # openpyxl fails to size a sheet without a single cell
+        if not any(sheet.rows):
+            return 0, 0
+        sheet.calculate_dimension(force=True)
 
-    if len(courses) > 0:
-        return pd.DataFrame(courses, columns=courses[0].keys())
-    return pd.DataFrame()
+    return sheet.max_row, sheet.max_column
 
 
 def get_course_details(workbook: xl.Workbook,
-                       sheets_list: list[xl_Worksheet]) -> pd.DataFrame:
+                       sheets_list: list[xl_Worksheet]) -> list[dict]:
     """Extract the course details from all sheets in 'sheets_list' within the
-      open workbook. Return a pandas dataframe containing the extracted
-      data."""
+      open workbook. Return a list of dicts, one per course, containing the
+      extracted data. Fields missing from a sheet are left as None."""
     course_details = []
 
     for sheet_name in sheets_list:
         sheet = workbook[sheet_name]
+        # Worked out once, openpyxl may have to scan the sheet each time
+        max_row, _ = _get_sheet_bounds(sheet)
 
         starting_row = -1
         col_num = {}
         course_cache = set()
 
-        for row_no in range(2, sheet.max_row):
+        # Indexing the sheet row by row would re-read it from the top
+        # for every row in read-only mode, stream it once instead
+        header_rows = sheet.iter_rows(min_row=2, max_row=max_row - 1,
+                                      values_only=True)
+        for row_no, values in enumerate(header_rows, start=2):
             columns_in_sheet = []
 
-            for cell in sheet[row_no]:
-                if cell.value is None:
+            for value in values:
+                if value is None:
                     break
-                if type(cell.value) is not str:
+                if type(value) is not str:
                     continue
-                columns_in_sheet.append(cell.value.lower().strip())
+                columns_in_sheet.append(value.lower().strip())
 
             col_num.clear()
 
             # Do we even have the columns ?
             for index, col_name in enumerate(columns_in_sheet):
-                col_name = col_name.lower()
-                if 'code' not in col_num and 'code' in col_name:
-                    col_num['code'] = index
-                elif 'title' not in col_num and ('title' in col_name or
-                                                 'course' in col_name):
-                    col_num['title'] = index
-                elif 'section' not in col_num and 'section' in col_name:
-                    col_num['section'] = index
-                elif ('instructor' not in col_num and
-                        ('teacher' in col_name or 'instructor' in col_name)):
-                    col_num['instructor'] = index
-                elif ('credit_hours' not in col_num and
-                        'credit' in col_name):
-                    col_num['credit_hours'] = index
-                elif 'offered_for' not in col_num and 'offered' in col_name:
-                    col_num['offered_for'] = index
-                elif 'category' not in col_num and 'category' in col_name:
-                    col_num['category'] = index
+                for needle, column in _HEADER_MAP:
+                    if column not in col_num and needle in col_name:
+                        col_num[column] = index
+                        break
 
             # Do we have our main identifiers ?
             if ('code' in col_num and 'section' in col_num and
@@ -223,7 +446,7 @@ def get_course_details(workbook: xl.Workbook,
                 starting_row = row_no + 1
                 break
 
-        if starting_row == sheet.max_row or starting_row == -1:
+        if starting_row == max_row or starting_row == -1:
             break
 
         repeated = False
@@ -240,7 +463,7 @@ def get_course_details(workbook: xl.Workbook,
                 continue
 
 
-            title = title.split('(')[0].strip().replace('&', 'and', 1)
+            title = title.partition('(')[0].strip().replace('&', 'and', 1)
             code = code.strip()
             section = section.strip()
 
@@ -249,24 +472,20 @@ def get_course_details(workbook: xl.Workbook,
                 continue
             course_cache.add((title, section))
 
-            course = {
-                'title': title,
-                'code': code,
-                'section': section,
-            }
+            instructor, credit_hours = None, None
+            program, target_dept = None, None
+            parent_dept, course_type = None, None
 
             if 'instructor' in col_num:
                 instructor = row[col_num['instructor']]
                 if instructor is not None:
                     # Ignore VF/CC if mentioned
-                    instructor = instructor.split('(')[0].strip()
-                course['instructor'] = instructor
+                    instructor = instructor.partition('(')[0].strip()
 
             if 'credit_hours' in col_num:
                 credit_hours = row[col_num['credit_hours']]
                 if type(credit_hours) is not int:
                     credit_hours = None
-                course['credit_hours'] = credit_hours
 
             if 'offered_for' in col_num:
                 offered_for = row[col_num['offered_for']]
@@ -278,11 +497,6 @@ def get_course_details(workbook: xl.Workbook,
                     else:
                         program = offered_for[:2]
                         target_dept = offered_for[2:].strip()
-                else:
-                    program, target_dept = None, None
-
-                course['program'] = program
-                course['target_department'] = target_dept
 
             if 'category' in col_num:
                 category = row[col_num['category']]
@@ -296,68 +510,97 @@ def get_course_details(workbook: xl.Workbook,
                         parent_dept = target_dept
                     course_type = category
 
-                course['parent_department'] = parent_dept
-                course['type'] = course_type
+            course_details.append({
+                'title': title,
+                'code': code,
+                'section': section,
+                'instructor': instructor,
+                'credit_hours': credit_hours,
+                'program': program,
+                'target_department': target_dept,
+                'parent_department': parent_dept,
+                'type': course_type,
+                'repeat': repeated,
+            })
+
+    return course_details
+
+
+def merge_timetable_with_details(course_details: list[dict],
+                                 timetable: list[dict]) -> list[dict]:
+    # Match titles between the two datasets
+    titles = _get_corresponding_titles(timetable, course_details)
+    for course, title in zip(timetable, titles):
+        course['title'] = title
+
+    # Pair each timetable course with the details of its section and title
+    details_by_key = _group_courses(
+        course_details, lambda course: (course['section'], course['title'])
+    )
 
-            course['repeat'] = repeated
+    course_data = []
+    course_data_unmerged = []
+    for course in timetable:
+        matched = details_by_key.get((course['section'], course['title']))
+        if matched is None:
+            course_data_unmerged.append(course)
+            continue
+        for details in matched:
+            course_data.append({**details, 'lectures': course['lectures']})
+            if details['instructor'] is None:
+                course_data[-1]['instructor'] = ''
 
-            course_details.append(course)
+    # Is there even a need of further processing ?
+    if len(course_data_unmerged) == 0:
+        return course_data
 
-    if len(course_details) > 0:
-        return pd.DataFrame(course_details, columns=course_details[0].keys())
-    return pd.DataFrame()
+    # Secondary match on the section group only
+    details_by_group = _group_courses(
+        course_details, lambda course: (course['section'][:6], course['title'])
+    )
 
+    # Append to the end of old data to keep the original order
+    for course in course_data_unmerged:
+        matched = details_by_group.get(
+            (course['section'][:6], course['title'])
+        )
+        if matched is None:
+            # Keep the lectures even without any details for them
+            course_data.append({**dict.fromkeys(_COURSE_COLUMNS), **course})
+            continue
+        for details in matched:
+            course_data.append({
+                **details,
+                'section': course['section'],
+                'lectures': course['lectures'],
+            })
 
-def merge_timetable_with_details(course_details: pd.DataFrame,
-                                 timetable: pd.DataFrame) -> pd.DataFrame:
-    # Match titles between the two dataframes
-    timetable['title'] = timetable.apply(
-       lambda row: _get_corresponding_title(row, course_details),
-       axis=1
-    )
+    return course_data
 
-    course_data = course_details.merge(
-       timetable, on=['section', 'title'], how='right',
-       indicator=True
-    )
-    course_data['instructor'] = course_data['instructor'].fillna('');
 
-    # Seperate the right_only data for further processing
-    course_data_unmerged = course_data[
-        course_data['_merge'] == 'right_only'
-    ][timetable.columns]
-    # Convert course_data to a inner merged one
-    course_data = course_data[course_data['_merge'] == 'both']
+def _group_courses(courses: list[dict], key) -> dict[tuple, list[dict]]:
+    """Group the courses by the value 'key' returns for each of them,
+      keeping their original order within each group."""
+    groups = {}
+    for course in courses:
+        groups.setdefault(key(course), []).append(course)
 
-    # No use for merge column anymore
-    course_data.drop('_merge', axis=1, inplace=True)
+    return groups
 
-    # Is there even a need of further processing ?
-    if course_data_unmerged.empty:
-        return course_data
 
-    # Temporary column for secondary merge
-    course_details['sec_tmp'] = course_details['section'] \
-                                    .apply(lambda sec : sec[:6])
-    course_data_unmerged['sec_tmp'] = course_data_unmerged['section'] \
-                                        .apply(lambda sec: sec[:6])
-
-    # Drop temporary & overlapping columns
-    course_data_unmerged = course_data_unmerged.merge(
-        course_details, on=['sec_tmp', 'title'], how='left',
-        suffixes=('', '_details')
-    ).drop(['section_details', 'sec_tmp'], axis=1)
-    course_details = course_details.drop('sec_tmp', axis=1)
-    # Append to the end of old data to convert it back to original state
-    course_data = pd.concat(
-        [course_data, course_data_unmerged],
-        ignore_index=True
-    )
+def generate_csv(course_data: list[dict], output_file: str) -> None:
+    """Write the course data to 'output_file' as CSV, with each course's
+      position as the first column. Missing values are left blank."""
+    columns = (*_COURSE_COLUMNS, 'lectures')
 
-    return course_data
+    with open(output_file, 'w', newline='') as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(['', *columns])
+        for row_no, course in enumerate(course_data):
+            writer.writerow([row_no, *(course.get(col) for col in columns)])
 
 
-def generate_pdf(course_data: pd.DataFrame, input_filename: str,
+def generate_pdf(course_data: list[dict], input_filename: str,
                  output_file: str) -> None:
     doc = SimpleDocTemplate(output_file, pagesize=landscape(letter))
 
@@ -369,13 +612,48 @@ def generate_pdf(course_data: pd.DataFrame, input_filename: str,
     h2_style = stylesheet['Heading2']
     h2_style.alignment = 1 # Center alignment
 
-    # Extra columns to facilitate with grouping
-    course_data['dept_and_batch'] = course_data['section'].str[:5]
-    course_data['sections_group'] = course_data['section'].str[:6]
+    table_columns = [
+        'day', 'start_time', 'end_time', 'title', 'room', 'instructor',
+        'credit_hours'
+    ]
+    table_header = [
+        'Day', 'Start Time', 'End Time', 'Subject', 'Room', 'Instructor', 'Credit Hours'
+    ]
 
-    grouped_data = course_data.groupby(
-        ['type', 'dept_and_batch', 'repeat', 'sections_group']
-    )
+    # One row per lecture, so that every table is just a slice of it
+    lectures = []
+    for course in course_data:
+        title = course['title']
+        # Append section letter + number to title of lectures of lab
+        if course['section'][6:] != '':
+            title += f" ({course['section'][5:]})"
+
+        for lecture in course['lectures']:
+            lectures.append({
+                **lecture,
+                'day_no': _get_day_no(lecture['day']),
+                'title': title,
+                'instructor': course['instructor'],
+                'credit_hours': course['credit_hours'],
+                'type': course['type'],
+                'repeat': course['repeat'],
+                # Extra columns to facilitate with grouping
+                'dept_and_batch': course['section'][:5],
+                'sections_group': course['section'][:6],
+            })
+
+    grouped_data = []
+    if len(lectures) > 0:
+        # Sort by days and timings once. Grouping keeps this order within
+        # every group, so no table needs sorting of its own.
+        lectures = pd.DataFrame(lectures).sort_values(
+            ['day_no', 'start_time'], kind='stable'
+        )
+        # Few distinct values per key, grouping on categories is cheaper.
+        # Groups still come out sorted, as categories are sorted too.
+        group_keys = ['type', 'dept_and_batch', 'repeat', 'sections_group']
+        lectures[group_keys] = lectures[group_keys].astype('category')
+        grouped_data = lectures.groupby(group_keys, observed=True)
 
     for group_name, data in grouped_data:
         course_type, _, repeat_status, section = group_name
@@ -387,26 +665,7 @@ def generate_pdf(course_data: pd.DataFrame, input_filename: str,
 
         section_heading = Paragraph(f"<u>{section}</u>", h2_style)
 
-        table_data = []
-        table_header = [
-            'Day', 'Start Time', 'End Time', 'Subject', 'Room', 'Instructor', 'Credit Hours'
-        ]
-
-        for row in data.itertuples(index=False):
-            for lecture in row.lectures:
-                table_data.append([
-                    lecture['day'], lecture['start_time'], lecture['end_time'],
-                    row.title, lecture['room'], row.instructor, row.credit_hours
-                ])
-                # Append section letter + number to title of lectures of lab
-                section_prefix = row.section[6:]
-                if section_prefix != '':
-                    table_data[-1][3] += f' ({row.section[5:]})'
-
-        # Sort the table data by days and timings
-        table_data = sorted(table_data,
-            key=lambda x: (_get_day_no(x[0]), x[1])
-        )
+        table_data = data[table_columns].values.tolist()
 
         # Merge consecutive cells with the same day value
         prev_day = None
@@ -459,63 +718,125 @@ def generate_pdf(course_data: pd.DataFrame, input_filename: str,
     doc.build(doc_elements)
 
 
+# Parent department of each course code prefix
+_DEPT_MAP = {
+    'NS': 'NS',
+    'MT': 'HSS',
+    'SS': 'HSS',
+    'SL': 'HSS',
+    'CS': 'CS',
+    'SE': 'CS',
+    'DS': 'DS',
+}
+
+
 def _get_dept_from_course_code(course_code: str) -> str:
     """Return the parent department corresponding to the course code.
       Return an empty string ('') for unknown course codes."""
-    departments = {'NS': 'NS', 'MT': 'HSS', 'MT': 'HSS', 'MT':'HSS',
-                   'CS' : 'CS', 'SE': 'CS', 'DS': 'DS'}
-
-    if course_code is None:
+    if not course_code:
         return ''
-    return departments.get(course_code[:2], '')
+    return _DEPT_MAP.get(course_code[:2], '')
+
+
+def _get_corresponding_titles(timetable: list[dict],
+                              course_details: list[dict]) -> list[str]:
+    """Return the closest matching title from the course details for
+      every course of the timetable, preferring titles of the same section,
+      then of the same semester, then any title at all. Courses without a
+      close match keep their own title."""
+    titles = [course['title'] for course in timetable]
+    choices = [course['title'] for course in course_details]
+    choice_sections = [course['section'] for course in course_details]
+
+    # A title already listed for its own section is its own best match,
+    # only the rest need fuzzy matching
+    listed = set(zip(choice_sections, choices))
+    pending = [row_no for row_no, course in enumerate(timetable)
+               if (course['section'], course['title']) not in listed]
+    if len(pending) == 0 or len(choices) == 0:
+        return titles
+
+    # Similarity of every pending title against every details title,
+    # with anything below the cutoff zeroed out. Titles repeat a lot
+    # across sections, so only score each distinct pair once. fuzz.ratio
+    # never scores a pair below difflib's ratio, this only rules out the
+    # pairs difflib would reject anyway.
+    unique_titles, title_ids = _get_unique(
+        [titles[row_no] for row_no in pending]
+    )
+    unique_choices, choice_ids = _get_unique(choices)
+    scores = process.cdist(unique_titles, unique_choices, scorer=fuzz.ratio,
+                           score_cutoff=60, workers=-1)
+    scores = scores[title_ids[:, None], choice_ids[None, :]]
+
+    sections = [timetable[row_no]['section'] for row_no in pending]
+    section_ids, choice_section_ids = _get_key_ids(sections, choice_sections)
+    semester_ids, choice_semester_ids = _get_key_ids(
+        [sec[:5] for sec in sections],
+        [sec[:5] if type(sec) is str else None for sec in choice_sections]
+    )
 
+    same_section = section_ids[:, None] == choice_section_ids[None, :]
+    same_semester = semester_ids[:, None] == choice_semester_ids[None, :]
 
-def _get_corresponding_title(row: pandas.core.series.Series,
-                             details_df: pd.DataFrame) -> str:
-    """Return the closest matching title for the current row from the
-      details DataFrame."""
-    title = row['title']
-    section = row['section']
+    # Pick among the pairs left by difflib's ratio itself, the way
+    # difflib.get_close_matches would
+    matcher = difflib.SequenceMatcher()
+    ratios = {}
 
-    details_exact_match = details_df[
-        details_df['section'].apply(lambda sec: sec == row['section'])
-    ]
-    res = difflib.get_close_matches(title, details_exact_match['title'])
+    unmatched = np.ones(len(pending), dtype=bool)
+    for mask in (same_section, same_semester, None):
+        tier_scores = scores if mask is None else np.where(mask, scores, 0)
+        for row_no in np.flatnonzero(unmatched):
+            title = titles[pending[row_no]]
+            matcher.set_seq2(title)
 
-    # Any matches already ?
-    if len(res) > 0:
-        return res[0]
+            best = None
+            for choice_no in np.flatnonzero(tier_scores[row_no]):
+                choice = choices[choice_no]
+                ratio = ratios.get((title, choice))
+                if ratio is None:
+                    matcher.set_seq1(choice)
+                    ratio = ratios[title, choice] = matcher.ratio()
+                if ratio >= 0.6 and (best is None or (ratio, choice) > best):
+                    best = (ratio, choice)
 
-    # Do we have a different section for the same semester?
-    details_semi_match = details_df[
-        details_df['section'].apply(
-            lambda sec: section[:5] in sec if type(sec) is str else False)
-    ]
+            # Any luck this time ?
+            if best is not None:
+                titles[pending[row_no]] = best[1]
+                unmatched[row_no] = False
+
+    return titles
 
-    res = difflib.get_close_matches(title, details_semi_match['title'])
 
-    # Any luck this time ?
-    if len(res) > 0:
-        return res[0]
+def _get_unique(values: list) -> tuple[list, np.ndarray]:
+    """Return the distinct values in order of first appearance, along with
+      the position of every value among them as an array."""
+    ids = {}
+    value_ids = np.array([ids.setdefault(value, len(ids)) for value in values])
 
-    res = difflib.get_close_matches(title, details_df['title'])
+    return list(ids), value_ids
 
-    return res[0] if len(res) > 0 else title
+
+def _get_key_ids(keys: list[str],
+                 choice_keys: list) -> tuple[np.ndarray, np.ndarray]:
+    """Number every distinct key once and return the numbers of both key
+      lists as arrays. Choice keys absent from 'keys' are numbered -1."""
+    ids = {}
+    key_ids = np.array([ids.setdefault(key, len(ids)) for key in keys])
+    choice_ids = np.array([ids.get(key, -1) for key in choice_keys])
+
+    return key_ids, choice_ids
 
 
 def _get_day_no(day: str) -> int:
     """Returns the chronological number of the day in a week"""
-    days = {
-        'monday': 1,
-        'tuesday': 2,
-        'wednesday': 3,
-        'thursday': 4,
-        'friday': 5,
-        'saturday': 6,
-        'sunday': 7
-    }
+    # Days coming from _get_day are already capitalized
+    day_no = _DAY_NUMBERS.get(day)
+    if day_no is None:
+        day_no = _DAY_NUMBERS.get(day.capitalize(), 0)
 
-    return days.get(day.lower(), 0)
+    return day_no
 
 
 def _print_example_usage():
@@ -537,43 +858,42 @@ def _print_example_usage():
     )
 
 
+def _parse_args(argv: list[str]) -> dict:
+    """Parse the command line arguments in a single pass. Return a dict of
+      the options present, each mapped to the value following it or to
+      None if it isn't followed by one."""
+    options = {}
+    for index, arg in enumerate(argv):
+        if not arg.startswith('--') or arg in options:
+            continue
+        value = argv[index + 1] if index + 1 < len(argv) else ''
+        # Do we actually have a proper value ?
+        options[arg] = value if value != '' and value[0] != '-' else None
+
+    return options
+
+
 def main():
-    if '--help' in sys.argv:
+    args = _parse_args(sys.argv[1:])
+
+    if '--help' in args:
         _print_example_usage()
         sys.exit(0)
 
-    try:
-        filename = sys.argv[sys.argv.index('--excel_file') + 1]
-        # Do we actually have a proper filename ?
-        if filename[0] == '-':
-            raise ValueError
-    except (ValueError, IndexError):
-        filename = 'timetable.xlsx'
-
-    create_csv = '--create_csv' in sys.argv
-    if create_csv:
-        try:
-            output_csv_filename = sys.argv[sys.argv.index('--output_csv') + 1]
-            # Do we actually have a proper filename ?
-            if output_csv_filename[0] == '-':
-                raise ValueError
-        except (ValueError, IndexError):
-            output_csv_filename = 'out.csv'
-
-    create_pdf = '--create_pdf' in sys.argv
-    if create_pdf:
-        try:
-            output_pdf_filename = sys.argv[sys.argv.index('--output_pdf') + 1]
-            # Do we actually have a proper filename ?
-            if output_pdf_filename[0] == '-':
-                raise ValueError
-        except (ValueError, IndexError):
-            output_pdf_filename = 'out.pdf'
+    filename = args.get('--excel_file') or 'timetable.xlsx'
+
+    create_csv = '--create_csv' in args
+    output_csv_filename = args.get('--output_csv') or 'out.csv'
+
+    create_pdf = '--create_pdf' in args
+    output_pdf_filename = args.get('--output_pdf') or 'out.pdf'
 
     # Load the Excel file
     print(f'Attempting to open {filename}')
     try:
-        workbook = xl.load_workbook(filename)
+        # Nothing is ever written back, external links are of no use either
+        workbook = xl.load_workbook(filename, read_only=True, data_only=True,
+                                    keep_links=False)
     except FileNotFoundError:
         sys.stderr.write(f'Error : Unable to open file: {filename}.\n')
         _print_example_usage()
@@ -598,9 +918,17 @@ def main():
     print('Done.')
 
     print('\nExtracting class details...')
-    course_timetable = parse_timetable(workbook[timetable_sheet])
+    timetable = workbook[timetable_sheet]
+    if not _can_stream(timetable):
+        # Read-only sheets expose neither merged cells nor column
+        # dimensions, load the timetable sheet in full instead
+        timetable = xl.load_workbook(filename, data_only=True,
+                                     keep_links=False)[timetable_sheet]
+    course_timetable = parse_timetable(timetable)
     print('Done.')
 
+    workbook.close()
+
     # Update timetable's course titles to match those in course details
     print('\nMerging course and class details...')
     course_data = merge_timetable_with_details(
@@ -611,8 +939,7 @@ def main():
 
     if create_csv:
         print(f'\nExporting to {output_csv_filename}')
-        with open(output_csv_filename, 'w') as file:
-            course_data.to_csv(file)
+        generate_csv(course_data, output_csv_filename)
         print('Done')
 
     if create_pdf: